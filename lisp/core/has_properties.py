@@ -15,13 +15,44 @@
 # You should have received a copy of the GNU General Public License
 # along with Linux Show Player.  If not, see <http://www.gnu.org/licenses/>.
 
+import sys
 from abc import ABCMeta
+from weakref import WeakKeyDictionary
 
 from lisp.core.properties import Property, InstanceProperty
-from lisp.core.signal import Signal
+from lisp.core.signal import Signal, Connection
 from lisp.core.util import typename
 
 
+class _LazyChangedSignal:
+    """Stand-in for a "changed" signal not yet created.
+
+    The actual Signal is created only when a slot is connected, so that
+    properties that are never observed don't keep a Signal object around.
+    """
+
+    __slots__ = ("_owner", "_name")
+
+    def __init__(self, owner, name):
+        self._owner = owner
+        self._name = name
+
+    def connect(self, slot_callable, mode=Connection.Direct):
+        self._owner._changed_signal(self._name, create=True).connect(
+            slot_callable, mode
+        )
+
+    def disconnect(self, slot=None):
+        signal = self._owner._changed_signal(self._name)
+        if signal is not None:
+            signal.disconnect(slot)
+
+    def emit(self, *args, **kwargs):
+        signal = self._owner._changed_signal(self._name)
+        if signal is not None:
+            signal.emit(*args, **kwargs)
+
+
 class HasPropertiesMeta(ABCMeta):
     """Metaclass for defining HasProperties classes.
 
@@ -41,8 +72,8 @@ class HasPropertiesMeta(ABCMeta):
         cls = super().__new__(mcls, name, bases, namespace, **kwargs)
 
         # Compute the set of property names
-        cls._properties_ = {
-            name
+        properties = {
+            sys.intern(name)
             for name, value in namespace.items()
             if isinstance(value, Property)
         }
@@ -50,7 +81,13 @@ class HasPropertiesMeta(ABCMeta):
         # Update the set from "proper" base classes
         for base in bases:
             if isinstance(base, HasPropertiesMeta):
-                cls._properties_.update(base._properties_)
+                properties.update(base._properties_)
+
+        # The set is immutable, it's replaced when properties are added/removed
+        cls._properties_ = frozenset(properties)
+        # Cache of filtered properties names, see `_cached_properties_names`
+        cls._filtered_names_ = WeakKeyDictionary()
+        cls._update_properties_cache()
 
         return cls
 
@@ -58,7 +95,7 @@ class HasPropertiesMeta(ABCMeta):
         super().__setattr__(name, value)
 
         if isinstance(value, Property):
-            cls._add_property(name)
+            cls._add_property(sys.intern(name))
 
     def __delattr__(cls, name):
         super().__delattr__(name)
@@ -67,15 +104,49 @@ class HasPropertiesMeta(ABCMeta):
             cls._del_property(name)
 
     def _add_property(cls, name):
-        cls._properties_.add(name)
+        cls._properties_ = cls._properties_ | {name}
+        cls._update_properties_cache()
         for subclass in cls.__subclasses__():
             subclass._add_property(name)
 
     def _del_property(cls, name):
-        cls._properties_.discard(name)
+        cls._properties_ = cls._properties_ - {name}
+        cls._update_properties_cache()
         for subclass in cls.__subclasses__():
             subclass._del_property(name)
 
+    def _update_properties_cache(cls):
+        cls._filtered_names_.clear()
+
+        # Properties defaults, used by `class_defaults`
+        cls._defaults_ = {
+            name: getattr(cls, name).default for name in cls._properties_
+        }
+
+    def _cached_properties_names(cls, filter=None):
+        """Return the class properties names, optionally filtered.
+
+        Results are cached per filter (the filter is weakly referenced),
+        filters are expected to always give the same result for the same input.
+
+        :rtype: frozenset
+        """
+        if not callable(filter):
+            return cls._properties_
+
+        try:
+            names = cls._filtered_names_.get(filter)
+        except TypeError:
+            # The filter cannot be weakly referenced, skip the cache
+            return frozenset(filter(set(cls._properties_)))
+
+        if names is None:
+            # Errors raised by the filter itself are not caught
+            names = frozenset(filter(set(cls._properties_)))
+            cls._filtered_names_[filter] = names
+
+        return names
+
 
 class HasProperties(metaclass=HasPropertiesMeta):
     """Base class which allow to use Property and InstanceProperty.
@@ -93,10 +164,15 @@ class HasProperties(metaclass=HasPropertiesMeta):
             nested = Property(default=AnotherThought.class_defaults())
     """
 
+    # Subclasses not defining __slots__ still get a __dict__, weak-references
+    # are needed by Property and Signal
+    __slots__ = ("__changed_signals", "property_changed", "__weakref__")
+
     def __init__(self):
-        self.__changed_signals = {}
+        self.__changed_signals = None
         # Contains signals that are emitted after the associated property is
-        # changed, the signals are created only when requested the first time.
+        # changed, the signals (and the dict) are created only when requested
+        # the first time.
 
         self.property_changed = Signal()
         # Emitted after property change (self, name, value)
@@ -107,14 +183,13 @@ class HasProperties(metaclass=HasPropertiesMeta):
         parameter and return a set with the property names filtered by
         some custom rule. The given set can be modified in-place.
 
+        The returned set is shared and MUST NOT be modified.
+
         :param filter: a function to filter the returned properties, or None
-        :rtype: set
+        :rtype: frozenset
         :return: The object `Properties` names
         """
-        if callable(filter):
-            return filter(self._properties_names())
-        else:
-            return self._properties_names()
+        return self.__class__._cached_properties_names(filter)
 
     def _properties_names(self):
         """Return a set of properties names, intended for internal usage.
@@ -124,7 +199,7 @@ class HasProperties(metaclass=HasPropertiesMeta):
 
         :rtype: set
         """
-        return self.__class__._properties_.copy()
+        return set(self.__class__._properties_)
 
     def properties_defaults(self, filter=None):
         """Instance properties defaults.
@@ -160,13 +235,11 @@ class HasProperties(metaclass=HasPropertiesMeta):
         """
         if callable(filter):
             return {
-                name: getattr(cls, name).default
-                for name in filter(cls._properties_.copy())
+                name: cls._defaults_[name]
+                for name in filter(set(cls._properties_))
             }
         else:
-            return {
-                name: getattr(cls, name).default for name in cls._properties_
-            }
+            return cls._defaults_.copy()
 
     def properties(self, defaults=True, filter=None):
         """
@@ -178,16 +251,29 @@ class HasProperties(metaclass=HasPropertiesMeta):
         :rtype: dict
         """
         properties = {}
-
-        for name in self.properties_names(filter=filter):
-            value = getattr(self, name)
-
-            if isinstance(value, HasProperties):
-                value = value.properties(defaults=defaults, filter=filter)
-                if defaults or value:
-                    properties[name] = value
-            elif defaults or value != self._property(name).default:
-                properties[name] = value
+        # Nested objects are visited iteratively, (parent-dict, name, dict)
+        nested = []
+        stack = [(self, properties)]
+
+        while stack:
+            obj, obj_properties = stack.pop()
+
+            for name in obj.properties_names(filter=filter):
+                value = getattr(obj, name)
+
+                if isinstance(value, HasProperties):
+                    value_properties = {}
+                    obj_properties[name] = value_properties
+                    nested.append((obj_properties, name, value_properties))
+                    stack.append((value, value_properties))
+                elif defaults or value != obj._property(name).default:
+                    obj_properties[name] = value
+
+        if not defaults:
+            # Drop empty nested dicts, the deepest ones (appended last) first
+            for parent, name, value_properties in reversed(nested):
+                if not value_properties:
+                    del parent[name]
 
         return properties
 
@@ -197,8 +283,10 @@ class HasProperties(metaclass=HasPropertiesMeta):
         :param properties: The element properties
         :type properties: dict
         """
+        names = self.properties_names()
+
         for name, value in properties.items():
-            if name in self.properties_names():
+            if name in names:
                 current = getattr(self, name)
                 if isinstance(current, HasProperties):
                     current.update_properties(value)
@@ -216,13 +304,28 @@ class HasProperties(metaclass=HasPropertiesMeta):
         :return: A signal that notifies that the given property has changed
         :rtype: Signal
 
-        The signals returned by this method are created lazily and cached.
+        The signals returned by this method are created lazily and cached,
+        until a slot is connected a lightweight stand-in is returned.
         """
+        name = sys.intern(name)
         if name not in self.properties_names():
             raise ValueError(f'no property "{name}" found')
 
-        signal = self.__changed_signals.get(name)
+        signal = self._changed_signal(name)
         if signal is None:
+            return _LazyChangedSignal(self, name)
+
+        return signal
+
+    def _changed_signal(self, name, create=False):
+        if self.__changed_signals is None:
+            if not create:
+                return None
+
+            self.__changed_signals = {}
+
+        signal = self.__changed_signals.get(name)
+        if signal is None and create:
             signal = Signal()
             self.__changed_signals[name] = signal
 
@@ -230,15 +333,19 @@ class HasProperties(metaclass=HasPropertiesMeta):
 
     def __setattr__(self, name, value):
         super().__setattr__(name, value)
-        if name in self.properties_names():
+        if name in self.__class__._properties_:
             self._emit_changed(name, value)
 
     def _emit_changed(self, name, value):
-        self.property_changed.emit(self, name, value)
-        try:
-            self.__changed_signals[name].emit(value)
-        except KeyError:
-            pass
+        # Skip the emission (and the arguments packing) when nobody listens
+        if not self.property_changed.is_empty():
+            self.property_changed.emit(self, name, value)
+
+        signals = self.__changed_signals
+        if signals is not None:
+            signal = signals.get(name)
+            if signal is not None and not signal.is_empty():
+                signal.emit(value)
 
     def _property(self, name):
         if name in self.__class__._properties_:
@@ -251,41 +358,66 @@ class HasProperties(metaclass=HasPropertiesMeta):
 
 
 class HasInstanceProperties(HasProperties):
-    # Fallback __init__
-    _i_properties_ = set()
+    __slots__ = ("_i_properties_",)
 
     def __init__(self):
+        # Registry of the instance-properties {name: InstanceProperty},
+        # those are not stored as attributes, see `__getattr__`.
+        # Must be set first (bypassing __setattr__), __setattr__ depends on it
+        object.__setattr__(self, "_i_properties_", {})
         super().__init__()
-        self._i_properties_ = set()
-        # Registry to keep track of instance-properties
+
+    def properties_names(self, filter=None):
+        if not self._i_properties_:
+            return super().properties_names(filter=filter)
+
+        # Instance-properties names can differ between instances, no caching
+        if callable(filter):
+            return filter(self._properties_names())
+        else:
+            return self._properties_names()
 
     def _properties_names(self):
-        return super()._properties_names().union(self._i_properties_)
+        names = super()._properties_names()
+        names.update(self._i_properties_)
+        return names
+
+    def __getattr__(self, name):
+        # Called only when the normal attribute lookup fails
+        if name == "_i_properties_":
+            # The registry is missing when __init__ didn't run, e.g. when
+            # copy/pickle rebuild the object (restoring its state calls
+            # __setattr__), use an empty one until the state replaces it
+            i_properties = {}
+            object.__setattr__(self, "_i_properties_", i_properties)
+            return i_properties
 
-    def __getattribute__(self, name):
-        attribute = super().__getattribute__(name)
-        if isinstance(attribute, InstanceProperty):
-            return attribute.__pget__()
+        try:
+            return self._i_properties_[name].__pget__()
+        except KeyError:
+            pass
 
-        return attribute
+        raise AttributeError(
+            f"'{typename(self)}' object has no attribute '{name}'"
+        )
 
     def __setattr__(self, name, value):
         if isinstance(value, InstanceProperty):
-            super().__setattr__(name, value)
-            self._i_properties_.add(name)
+            self._i_properties_[sys.intern(name)] = value
         elif name in self._i_properties_:
-            property = super().__getattribute__(name)
-            property.__pset__(value)
+            self._i_properties_[name].__pset__(value)
             self._emit_changed(name, value)
         else:
             super().__setattr__(name, value)
 
     def __delattr__(self, name):
-        super().__delattr__(name)
-        self._i_properties_.discard(name)
+        if name in self._i_properties_:
+            del self._i_properties_[name]
+        else:
+            super().__delattr__(name)
 
     def _property(self, name):
         if name in self._i_properties_:
-            return self._getattribute(name)
+            return self._i_properties_[name]
 
         return super()._property(name)
@@ -208,6 +208,10 @@ class Signal:
             with self.__lock:
                 self.__slots.clear()
 
+    def is_empty(self):
+        """Return True if no slot is connected."""
+        return not self.__slots
+
     def emit(self, *args, **kwargs):
         """Emit the signal within the given arguments"""
         with self.__lock:
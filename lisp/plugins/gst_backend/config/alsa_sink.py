@@ -28,13 +28,9 @@ class AlsaSinkConfig(AlsaSinkSettings):
         super().__init__(**kwargs)
 
     def loadSettings(self, settings):
-        device = settings.get("alsa_device", AlsaSink.FALLBACK_DEVICE)
-
-        self.deviceComboBox.setCurrentText(
-            self.devices.get(
-                device, self.devices.get(AlsaSink.FALLBACK_DEVICE, "")
-            )
+        self._select_device(
+            settings.get("alsa_device", AlsaSink.FALLBACK_DEVICE)
         )
 
     def getSettings(self):
-        return {"alsa_device": self.deviceComboBox.currentData()}
+        return {"alsa_device": self._selected_device()}
@@ -15,6 +15,9 @@
 # You should have received a copy of the GNU General Public License
 # along with Linux Show Player.  If not, see <http://www.gnu.org/licenses/>.
 
+import logging
+
+import jack
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import (
     QGroupBox,
@@ -25,30 +28,44 @@ from PyQt5.QtWidgets import (
 )
 from pyalsa import alsacard
 
+from lisp.core.decorators import async_function
+from lisp.core.signal import Signal, Connection
 from lisp.plugins.gst_backend import GstBackend
 from lisp.plugins.gst_backend.elements.alsa_sink import AlsaSink
+from lisp.plugins.gst_backend.elements.jack_sink import JackSink
 from lisp.plugins.gst_backend.settings.jack_sink import JackConnectionsDialog
 from lisp.ui.settings.pages import SettingsPage
 from lisp.ui.ui_utils import translate
 
-import logging
-import jack
-
 logger = logging.getLogger(__name__)
 
 
-
 class AlsaSinkSettings(SettingsPage):
     ELEMENT = AlsaSink
     Name = ELEMENT.Name
 
+    # Last discovered devices, used to populate new pages without waiting
+    _DevicesCache = None
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.setLayout(QVBoxLayout())
         self.layout().setAlignment(Qt.AlignTop)
 
         self.devices = {}
-        self.discover_output_pcm_devices()
+        # The device to select, kept until the devices are discovered
+        self._device = None
+
+        # Emitted (from another thread) when the discovery is completed
+        self.devicesDiscovered = Signal()
+        self.devicesDiscovered.connect(
+            self.__devices_discovered, Connection.QtQueued
+        )
+        # Emitted (from another thread) when the JACK client is created
+        self.jackClientCreated = Signal()
+        self.jackClientCreated.connect(
+            self.__jack_client_created, Connection.QtQueued
+        )
 
         self.deviceGroup = QGroupBox(self)
         self.deviceGroup.setGeometry(0, 0, self.width(), 100)
@@ -56,45 +73,58 @@ class AlsaSinkSettings(SettingsPage):
         self.layout().addWidget(self.deviceGroup)
 
         self.deviceComboBox = QComboBox(self.deviceGroup)
-        for name, description in self.devices.items():
-            self.deviceComboBox.addItem(description, name)
-
         self.deviceGroup.layout().addWidget(self.deviceComboBox)
 
         self.helpLabel = QLabel(self.deviceGroup)
         self.helpLabel.setWordWrap(True)
         self.deviceGroup.layout().addWidget(self.helpLabel)
 
-        self.darioLabel = QLabel(self.deviceGroup)
-        self.darioLabel.setWordWrap(True)
-        self.darioLabel.setText("messaggio di prova")
-        self.deviceGroup.layout().addWidget(self.darioLabel)
-
         self.retranslateUi()
         
         # Create a new button
-        open_jack_connections_button = QPushButton("Open Jack Connections", self)
+        self.open_jack_connections_button = QPushButton("Open Jack Connections", self)
         # Add the button to the layout
-        self.layout().addWidget(open_jack_connections_button)
+        self.layout().addWidget(self.open_jack_connections_button)
         # Connect the button's clicked signal to a slot that opens the JackConnectionsDialog
-        open_jack_connections_button.clicked.connect(self.open_jack_connections_dialog)
+        self.open_jack_connections_button.clicked.connect(self.open_jack_connections_dialog)
+
+        # Show the known devices right away, then refresh them in background
+        if AlsaSinkSettings._DevicesCache is not None:
+            self.__devices_discovered(AlsaSinkSettings._DevicesCache)
+        self.discover_output_pcm_devices()
 
     def open_jack_connections_dialog(self):
-        # Create and show the JackConnectionsDialog
-        self._temp_jack_client = None
+        # The dialog is opened once the client is created, see
+        # `__jack_client_created`
+        self.open_jack_connections_button.setEnabled(False)
+        self.create_jack_client()
+
+    @async_function
+    def create_jack_client(self):
+        # Runs in a separate thread, connecting to JACK can take a while
+        client = None
         try:
-            self._temp_jack_client = jack.Client(
+            client = jack.Client(
                 "LinuxShowPlayer_SettingsControl", no_start_server=True
             )
         except jack.JackError:
-            # Disable the widget
-            self.setEnabled(False)
             logger.error(
                 "Cannot connect with a running Jack server.", exc_info=True
             )
 
+        self.jackClientCreated.emit(client)
+
+    def __jack_client_created(self, client):
+        self.open_jack_connections_button.setEnabled(True)
+
+        self._temp_jack_client = client
+        if client is None:
+            # Disable the widget
+            self.setEnabled(False)
+            return
+
+        # Create and show the JackConnectionsDialog
         dialog = JackConnectionsDialog(self._temp_jack_client, parent=self)
-        from lisp.plugins.gst_backend.elements.jack_sink import JackSink
         dialog.set_connections(JackSink.default_connections(self._temp_jack_client).copy())
         dialog.exec()
         if dialog.result() == dialog.Accepted:
@@ -116,23 +146,38 @@ class AlsaSinkSettings(SettingsPage):
         self.setGroupEnabled(self.deviceGroup, enabled)
 
     def loadSettings(self, settings):
-        device = settings.get(
-            "device",
-            GstBackend.Config.get("alsa_device", AlsaSink.FALLBACK_DEVICE),
-        )
-
-        self.deviceComboBox.setCurrentText(
-            self.devices.get(device, self.devices.get(AlsaSink.FALLBACK_DEVICE))
+        self._select_device(
+            settings.get(
+                "device",
+                GstBackend.Config.get("alsa_device", AlsaSink.FALLBACK_DEVICE),
+            )
         )
 
     def getSettings(self):
         if self.isGroupEnabled(self.deviceGroup):
-            return {"device": self.deviceComboBox.currentData()}
+            return {"device": self._selected_device()}
 
         return {}
 
+    def _select_device(self, device):
+        self._device = device
+        self.deviceComboBox.setCurrentText(
+            self.devices.get(
+                device, self.devices.get(AlsaSink.FALLBACK_DEVICE, "")
+            )
+        )
+
+    def _selected_device(self):
+        if self.deviceComboBox.count() > 0:
+            return self.deviceComboBox.currentData()
+
+        # The devices are not yet discovered
+        return self._device
+
+    @async_function
     def discover_output_pcm_devices(self):
-        self.devices = {}
+        # Runs in a separate thread, querying ALSA can take a while
+        devices = {}
 
         # Get a list of the pcm devices "hints", the result is a combination of
         # "snd_device_name_hint()" and "snd_device_name_get_hint()"
@@ -140,4 +185,20 @@ class AlsaSinkSettings(SettingsPage):
             ioid = pcm.get("IOID")
             # Keep only bi-directional and output devices
             if ioid is None or ioid == "Output":
-                self.devices[pcm["NAME"]] = pcm.get("DESC", pcm["NAME"])
+                devices[pcm["NAME"]] = pcm.get("DESC", pcm["NAME"])
+
+        AlsaSinkSettings._DevicesCache = devices
+        self.devicesDiscovered.emit(devices)
+
+    def __devices_discovered(self, devices):
+        if devices == self.devices:
+            return
+
+        selected = self._selected_device()
+
+        self.devices = devices
+        self.deviceComboBox.clear()
+        for name, description in self.devices.items():
+            self.deviceComboBox.addItem(description, name)
+
+        self._select_device(selected)
@@ -19,12 +19,13 @@ import logging
 import re
 
 import jack
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QPainter, QPolygon, QPainterPath
+from PyQt5.QtCore import Qt, QAbstractItemModel, QLineF, QModelIndex, QTimer
+from PyQt5.QtGui import QPainter, QPainterPath
 from PyQt5.QtWidgets import (
     QGroupBox,
     QWidget,
     QHBoxLayout,
+    QTreeView,
     QTreeWidget,
     QTreeWidgetItem,
     QGridLayout,
@@ -43,6 +44,9 @@ from lisp.ui.ui_utils import translate
 
 logger = logging.getLogger(__name__)
 
+# Split a port name in base-name and trailing channel number
+_PORT_TAIL_NUM = re.compile(r"^(.*?)(\d+)$")
+
 
 class JackSinkSettings(SettingsPage):
     ELEMENT = JackSink
@@ -62,6 +66,8 @@ class JackSinkSettings(SettingsPage):
         self.jackGroup.layout().addWidget(self.connectionsEdit)
 
         self.__jack_client = None
+        # Created on first use, then only refreshed, see `__edit_connections`
+        self.__dialog = None
         try:
             self.__jack_client = jack.Client(
                 "LinuxShowPlayer_SettingsControl", no_start_server=True
@@ -85,6 +91,9 @@ class JackSinkSettings(SettingsPage):
         )
 
     def closeEvent(self, event):
+        if self.__dialog is not None:
+            self.__dialog.deleteLater()
+            self.__dialog = None
         if self.__jack_client is not None:
             self.__jack_client.close()
         super().closeEvent(event)
@@ -105,31 +114,101 @@ class JackSinkSettings(SettingsPage):
 
     def __edit_connections(self):
         # invoked when editing jack connections for given selected cue
-        dialog = JackConnectionsDialog(self.__jack_client, parent=self)
-        dialog.set_connections(self.connections.copy())
-        dialog.exec()
+        if self.__dialog is None:
+            self.__dialog = JackConnectionsDialog(
+                self.__jack_client, parent=self
+            )
+        else:
+            self.__dialog.update_graph()
+
+        self.__dialog.set_connections(self.connections)
+        self.__dialog.exec()
+
+        if self.__dialog.result() == self.__dialog.Accepted:
+            self.connections = self.__dialog.connections
+
+
+class JackPortsModel(QAbstractItemModel):
+    """Two levels (clients -> ports) model of the JACK ports.
+
+    Clients indexes have internalId 0, ports indexes have the row of their
+    client, plus one, as internalId.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._header = ""
+        # [(client_name, [(port_full_name, port_display_name), ...]), ...]
+        self._clients = []
+        # {port_full_name: (row, internalId)}
+        self._ports = {}
+
+    def set_clients(self, clients):
+        self.beginResetModel()
+        self._clients = clients
+        self._ports = {
+            full_name: (row, client_row + 1)
+            for client_row, (_, ports) in enumerate(clients)
+            for row, (full_name, _) in enumerate(ports)
+        }
+        self.endResetModel()
+
+    def set_header(self, text):
+        self._header = text
+        self.headerDataChanged.emit(Qt.Horizontal, 0, 0)
+
+    def rowCount(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return len(self._clients)
+        if parent.internalId() == 0:
+            return len(self._clients[parent.row()][1])
+
+        return 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        if parent.isValid():
+            return self.createIndex(row, column, parent.row() + 1)
+
+        return self.createIndex(row, column, 0)
 
-        if dialog.result() == dialog.Accepted:
-            self.connections = dialog.connections
+    def parent(self, index):
+        if index.isValid() and index.internalId() > 0:
+            return self.createIndex(index.internalId() - 1, 0, 0)
 
+        return QModelIndex()
 
-class ClientItem(QTreeWidgetItem):
-    def __init__(self, client_name):
-        super().__init__([client_name])
+    def data(self, index, role=Qt.DisplayRole):
+        if index.isValid() and role == Qt.DisplayRole:
+            client = index.internalId()
+            if client == 0:
+                return self._clients[index.row()][0]
 
-        self.name = client_name
-        self.ports = {}
+            return self._clients[client - 1][1][index.row()][1]
 
-    def add_port(self, full_name, display_name):
-        self.ports[full_name] = PortItem(full_name, display_name)
-        self.addChild(self.ports[full_name])
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self._header
 
+    def flags(self, index):
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
 
-class PortItem(QTreeWidgetItem):
-    def __init__(self, full_name, display_name):
-        super().__init__([display_name])
+    def port_name(self, index):
+        """Return the full name of the port at index, None for clients."""
+        if index.isValid() and index.internalId() > 0:
+            return self._clients[index.internalId() - 1][1][index.row()][0]
 
-        self.name = full_name
+    def port_index(self, name):
+        """Return the index of the port with the given full name."""
+        position = self._ports.get(name)
+        if position is not None:
+            return self.createIndex(position[0], 0, position[1])
+
+        return QModelIndex()
 
 
 class ConnectionsWidget(QWidget):
@@ -140,9 +219,14 @@ class ConnectionsWidget(QWidget):
 
         self._output_widget = output_widget
         self._input_widget = input_widget
-        self.connections = []
+        # {(output_index, port_full_name), ...}, kept in sync by the dialog
+        self.connected = set()
 
     def paintEvent(self, QPaintEvent):
+        if not self.connected:
+            # Nothing to draw
+            return
+
         yc = self.y()
         yo = self._output_widget.y()
         yi = self._input_widget.y()
@@ -155,51 +239,73 @@ class ConnectionsWidget(QWidget):
         painter = QPainter(self)
         painter.setRenderHint(QPainter.Antialiasing)
 
-        for output, out_conn in enumerate(self.connections):
-            y1 = int(
-                self.item_y(self._output_widget.topLevelItem(output))
-                + (yo - yc)
-            )
+        # The lines horizontal geometry is the same for all the connections
+        cp = int((x2 - x1 - 8) * 0.4)
+        xo1 = x1 + 4
+        xo2 = x2 - 4
+        xc1 = xo1 + cp
+        xc2 = xo2 - cp
 
-            for client in range(self._input_widget.topLevelItemCount()):
-                client = self._input_widget.topLevelItem(client)
+        # All the lines and dots are collected, then drawn with one call each
+        path = QPainterPath()
+        dots = []
 
-                for port in client.ports:
-                    if port in self.connections[output]:
-                        y2 = int(self.item_y(client.ports[port]) + (yi - yc))
-                        self.draw_connection_line(
-                            painter, x1, y1, x2, y2, h1, h2
-                        )
+        model = self._input_widget.model()
+
+        # Rows positions, each row rect is queried once per paint
+        out_y = {}
+        in_y = {}
+
+        for output, port in self.connected:
+            index = model.port_index(port)
+            if not index.isValid():
+                # The port is not available (anymore)
+                continue
+
+            y1 = out_y.get(output)
+            if y1 is None:
+                y1 = int(
+                    self.item_y(self._output_widget.topLevelItem(output))
+                    + (yo - yc)
+                )
+                out_y[output] = y1
+
+            y2 = in_y.get(port)
+            if y2 is None:
+                y2 = int(self.index_y(self._input_widget, index) + (yi - yc))
+                in_y[port] = y2
+
+            self.add_connection_line(
+                path, dots, x1, y1, x2, y2, h1, h2, xo1, xo2, xc1, xc2
+            )
+
+        painter.strokePath(path, painter.pen())
+        if dots:
+            painter.drawLines(dots)
 
         painter.end()
 
     @staticmethod
-    def draw_connection_line(painter, x1, y1, x2, y2, h1, h2):
+    def add_connection_line(
+        path, dots, x1, y1, x2, y2, h1, h2, xo1, xo2, xc1, xc2
+    ):
         # Account for list view headers.
         y1 += h1
         y2 += h2
 
         # Invisible output ports don't get a connecting dot.
         if y1 > h1:
-            painter.drawLine(x1, y1, x1 + 4, y1)
+            dots.append(QLineF(x1, y1, xo1, y1))
 
-        # Setup control points
-        spline = QPolygon(4)
-        cp = int((x2 - x1 - 8) * 0.4)
-        spline.setPoints(
-            x1 + 4, y1, x1 + 4 + cp, y1, x2 - 4 - cp, y2, x2 - 4, y2
-        )
         # The connection line
-        path = QPainterPath()
-        path.moveTo(spline.at(0))
-        path.cubicTo(spline.at(1), spline.at(2), spline.at(3))
-        painter.strokePath(path, painter.pen())
+        path.moveTo(xo1, y1)
+        path.cubicTo(xc1, y1, xc2, y2, xo2, y2)
 
         # painter.drawLine(x1 + 4, y1, x2 - 4, y2)
 
         # Invisible input ports don't get a connecting dot.
         if y2 > h2:
-            painter.drawLine(x2 - 4, y2, x2, y2)
+            dots.append(QLineF(xo2, y2, x2, y2))
 
     @staticmethod
     def item_y(item):
@@ -213,6 +319,17 @@ class ConnectionsWidget(QWidget):
 
         return rect.top() + rect.height() / 2
 
+    @staticmethod
+    def index_y(view, index):
+        parent = index.parent()
+
+        if parent.isValid() and not view.isExpanded(parent):
+            rect = view.visualRect(parent)
+        else:
+            rect = view.visualRect(index)
+
+        return rect.top() + rect.height() / 2
+
 
 class JackConnectionsDialog(QDialog):
     def __init__(self, jack_client, parent=None, **kwargs):
@@ -225,20 +342,41 @@ class JackConnectionsDialog(QDialog):
         self.setLayout(QGridLayout())
 
         self.output_widget = QTreeWidget(self)
-        self.input_widget = QTreeWidget(self)
+        self.input_model = JackPortsModel(parent=self)
+        self.input_widget = QTreeView(self)
+        self.input_widget.setModel(self.input_model)
+        # All rows are single-line labels, skip the per-row height computation
+        self.output_widget.setUniformRowHeights(True)
+        self.input_widget.setUniformRowHeights(True)
 
         self.connections_widget = ConnectionsWidget(
             self.output_widget, self.input_widget, parent=self
         )
-        self.output_widget.itemExpanded.connect(self.connections_widget.update)
-        self.output_widget.itemCollapsed.connect(self.connections_widget.update)
-        self.input_widget.itemExpanded.connect(self.connections_widget.update)
-        self.input_widget.itemCollapsed.connect(self.connections_widget.update)
+
+        # Many expand/collapse in the same event-loop cycle lead to a single
+        # repaint of the connections
+        self.__repaint_timer = QTimer(self)
+        self.__repaint_timer.setSingleShot(True)
+        self.__repaint_timer.setInterval(0)
+        self.__repaint_timer.timeout.connect(self.connections_widget.update)
+
+        self.output_widget.itemExpanded.connect(
+            lambda: self.__repaint_timer.start()
+        )
+        self.output_widget.itemCollapsed.connect(
+            lambda: self.__repaint_timer.start()
+        )
+        self.input_widget.expanded.connect(
+            lambda: self.__repaint_timer.start()
+        )
+        self.input_widget.collapsed.connect(
+            lambda: self.__repaint_timer.start()
+        )
 
         self.stereo_mode_checkbox = QCheckBox("Stereo mode")
         self.stereo_mode_checkbox.setChecked(True)  # Set to True by default
 
-        self.input_widget.itemSelectionChanged.connect(
+        self.input_widget.selectionModel().selectionChanged.connect(
             self.__input_selection_changed
         )
         self.output_widget.itemSelectionChanged.connect(
@@ -254,7 +392,7 @@ class JackConnectionsDialog(QDialog):
         self.layout().setColumnStretch(2, 2)
 
         self.connectButton = QPushButton(self)
-        self.connectButton.clicked.connect(self.__disconnect_selected)
+        self.connectButton.clicked.connect(self.__on_connect_button)
         self.connectButton.setEnabled(False)
 
         self.disconnect_all_button = QPushButton(self)
@@ -290,54 +428,93 @@ class JackConnectionsDialog(QDialog):
         self.__jack_client = jack_client
         self.__selected_in = None
         self.__selected_out = None
+        # Names of the available input ports, set by `update_graph`
+        self.__input_names = set()
+        # Names of the ports shown by the last `update_graph`
+        self.__last_ports = None
 
         self.connections = []
+        # Same content of connections, as (output, port_name) pairs
+        self.__connected = set()
         self.update_graph()
-        self.input_widget.expandAll()
-
 
     def retranslateUi(self):
         self.output_widget.setHeaderLabels(
             [translate("JackSinkSettings", "Output ports")]
         )
-        self.input_widget.setHeaderLabels(
-            [translate("JackSinkSettings", "Input ports")]
+        self.input_model.set_header(
+            translate("JackSinkSettings", "Input ports")
         )
         self.connectButton.setText(translate("JackSinkSettings", "Connect"))
 
     def set_connections(self, connections):
-        self.connections = connections
-        self.connections_widget.connections = self.connections
-        self.connections_widget.update()
+        # The lists are edited in place, work on copies so that the caller
+        # data is left untouched if the dialog is cancelled
+        self.connections = [out_conn.copy() for out_conn in connections]
+        self.__connected = {
+            (output, port)
+            for output, out_conn in enumerate(self.connections)
+            for port in out_conn
+        }
+        self.connections_widget.connected = self.__connected
+        self.__refresh_after_mutation()
+
+    def __refresh_after_mutation(self):
+        # Repaints requested in the same event-loop cycle are merged
+        self.__repaint_timer.start()
+        self.__check_selection()
 
     def update_graph(self):
         input_ports = self.__jack_client.get_ports(is_audio=True, is_input=True)
 
-        self.output_widget.clear()
-        for port in range(8):
-            self.output_widget.addTopLevelItem(
-                QTreeWidgetItem(["output_" + str(port)])
-            )
+        # When the dialog is reopened the ports are usually the same
+        ports_names = tuple(port.name for port in input_ports)
+        if ports_names == self.__last_ports:
+            return
+        self.__last_ports = ports_names
+
+        # Used for the stereo-mode lookups, avoid querying JACK again
+        self.__input_names = {port.name for port in input_ports}
 
-        self.input_widget.clear()
+        # {client_name: [(port_full_name, port_display_name), ...]}
         clients = {}
         for port in input_ports:
-            try:
-                colon_index = port.name.index(":")
-                client_name = port.name[:colon_index]
-                port_display_name = port.name[colon_index + 1 :]
+            client_name, sep, port_display_name = port.name.partition(":")
+            if not sep:
+                continue
 
-                if client_name not in clients:
-                    clients[client_name] = ClientItem(client_name)
-                    self.input_widget.addTopLevelItem(clients[client_name])
+            clients.setdefault(client_name, []).append(
+                (port.name, port_display_name)
+            )
 
-                clients[client_name].add_port(port.name, port_display_name)
-            except ValueError:
-                pass
+        # Refresh both views at once, when all the rows are in place
+        self.output_widget.setUpdatesEnabled(False)
+        self.input_widget.setUpdatesEnabled(False)
+        try:
+            self.__selected_out = None
+            self.output_widget.clear()
+            self.output_widget.addTopLevelItems(
+                [QTreeWidgetItem(["output_" + str(port)]) for port in range(8)]
+            )
+
+            self.__selected_in = None
+            self.input_model.set_clients(list(clients.items()))
+            # Expand everything once, after the reset, with the recursive
+            # call; don't loop over the clients calling setExpanded/expand,
+            # each call would trigger a new layout of the view.
+            self.input_widget.expandAll()
+        finally:
+            self.output_widget.setUpdatesEnabled(True)
+            self.input_widget.setUpdatesEnabled(True)
+
+        # The selection is gone, the dialog can be reused
+        self.__check_selection()
 
     def __input_selection_changed(self):
-        if self.input_widget.selectedItems():
-            self.__selected_in = self.input_widget.selectedItems()[0]
+        indexes = self.input_widget.selectionModel().selectedIndexes()
+        if indexes:
+            # Clients cannot be connected, only ports
+            self.__selected_in = self.input_model.port_name(indexes[0])
         else:
             self.__selected_in = None
 
@@ -353,49 +530,62 @@ class JackConnectionsDialog(QDialog):
 
     def __check_selection(self):
         if self.__selected_in is not None and self.__selected_out is not None:
-            output = self.output_widget.indexOfTopLevelItem(self.__selected_out)
-
-            self.connectButton.clicked.disconnect()
             self.connectButton.setEnabled(True)
 
-            if self.__selected_in.name in self.connections[output]:
+            if self.__is_selected_connected():
                 self.connectButton.setText(
                     translate("JackSinkSettings", "Disconnect")
                 )
-                self.connectButton.clicked.connect(self.__disconnect_selected)
             else:
                 self.connectButton.setText(
                     translate("JackSinkSettings", "Connect")
                 )
-                self.connectButton.clicked.connect(self.__connect_selected)
         else:
             self.connectButton.setEnabled(False)
         # Check if there are any connections set
-        if any(self.connections):
+        if self.__connected:
             self.disconnect_all_button.setEnabled(True)
         else:
             self.disconnect_all_button.setEnabled(False)
    
+    def __is_selected_connected(self):
+        output = self.output_widget.indexOfTopLevelItem(self.__selected_out)
+        return (output, self.__selected_in) in self.__connected
+
+    def __on_connect_button(self):
+        if self.__selected_in is None or self.__selected_out is None:
+            return
+
+        if self.__is_selected_connected():
+            self.__disconnect_selected()
+        else:
+            self.__connect_selected()
+
     def __connect_selected(self):
         output = self.output_widget.indexOfTopLevelItem(self.__selected_out)
-        self.connections[output].append(self.__selected_in.name)
+        self.connections[output].append(self.__selected_in)
+        self.__connected.add((output, self.__selected_in))
         if self.stereo_mode_checkbox.isChecked():
             # stereo mode: checking if next pain of output and input ports are available for automatically connecting channel 2
             # first, calculate name of next input port
-            match = re.match(r"^(.*?)(\d+)$", self.__selected_in.name)
+            match = _PORT_TAIL_NUM.match(self.__selected_in)
             if match:
                 base_name, number = match.groups()
                 next_input_port_name = f"{base_name}{int(number) + 1}"
             else:
-                next_input_port_name = self.__selected_in.name + "_1"
+                next_input_port_name = self.__selected_in + "_1"
             # then, check availability of next input port
-            available_input_ports = self.__jack_client.get_ports()
-            if next_input_port_name in [one_port.name for one_port in available_input_ports]:
+            if next_input_port_name in self.__input_names:
                 # input port is available, so check if output port is available: as output port is identified simply by an index, increment by 1 and check
                 next_output = output + 1
                 if(next_output < self.output_widget.topLevelItemCount()):
                     # both input and outpuport are available, connect channel 2
-                    self.connections[next_output].append(next_input_port_name)
+                    pair = (next_output, next_input_port_name)
+                    if pair not in self.__connected:
+                        self.connections[next_output].append(
+                            next_input_port_name
+                        )
+                        self.__connected.add(pair)
                 else:
                     QMessageBox.information(
                         self,
@@ -410,17 +600,16 @@ class JackConnectionsDialog(QDialog):
                     "No input ports are available for stereo mode.",
                     QMessageBox.Ok
                 )
-        self.connections_widget.update()
-        self.__check_selection()
+        self.__refresh_after_mutation()
 
     def __disconnect_selected(self):
         output = self.output_widget.indexOfTopLevelItem(self.__selected_out)
-        self.connections[output].remove(self.__selected_in.name)
-        self.connections_widget.update()
-        self.__check_selection()
+        self.connections[output].remove(self.__selected_in)
+        self.__connected.discard((output, self.__selected_in))
+        self.__refresh_after_mutation()
 
     def __disconnect_all(self):
-        for output in range(len(self.connections)):
-            self.connections[output] = []
-        self.connections_widget.update()
-        self.__check_selection()
+        for out_conn in self.connections:
+            out_conn.clear()
+        self.__connected.clear()
+        self.__refresh_after_mutation()
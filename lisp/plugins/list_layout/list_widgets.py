@@ -15,6 +15,8 @@
 # You should have received a copy of the GNU General Public License
 # along with Linux Show Player.  If not, see <http://www.gnu.org/licenses/>.
 
+from functools import lru_cache
+
 from PyQt5.QtCore import QRect, QSize, Qt
 from PyQt5.QtGui import (
     QBrush,
@@ -33,6 +35,28 @@ from lisp.cues.cue_time import CueTime, CueWaitTime
 from lisp.ui.icons import IconTheme
 from lisp.ui.widgets.cue_next_actions import tr_next_action
 
+# Next-action values (as stored in the cue property), to avoid comparing the
+# enum members at every update
+_AFTER_WAIT_ACTIONS = frozenset(
+    (CueNextAction.TriggerAfterWait.value, CueNextAction.SelectAfterWait.value)
+)
+_AFTER_END_ACTIONS = frozenset(
+    (CueNextAction.TriggerAfterEnd.value, CueNextAction.SelectAfterEnd.value)
+)
+
+
+@lru_cache(maxsize=4096)
+def _strtime_deciseconds(deciseconds):
+    # With accurate=1 only tenths of second are displayed, the text depends
+    # only on the time in deciseconds, so the cache is hit at every refresh
+    return strtime(deciseconds * 100, accurate=1)
+
+
+def _strtime_tenths(time):
+    """Same as `strtime(time, accurate=1)`, but cached."""
+    return _strtime_deciseconds(int(time) // 100)
+
+
 class HotKeyWidget(QLabel):
     def __init__(self, item, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -113,7 +137,7 @@ class CueStatusIcons(QWidget):
         super().__init__(*args)
         self.setAttribute(Qt.WA_TranslucentBackground)
 
-        self._icon = None
+        self._icon_name = None
         self._item = item
 
         self._item.cue.changed("icon").connect(
@@ -130,13 +154,13 @@ class CueStatusIcons(QWidget):
 
     def updateIcon(self):
         if self._item.cue.state & CueState.Running:
-            self._icon = IconTheme.get(f"{self._item.cue.icon}-running")
+            self._icon_name = f"{self._item.cue.icon}-running"
         elif self._item.cue.state & CueState.Pause:
-            self._icon = IconTheme.get(f"{self._item.cue.icon}-pause")
+            self._icon_name = f"{self._item.cue.icon}-pause"
         elif self._item.cue.state & CueState.Error:
-            self._icon = IconTheme.get(f"{self._item.cue.icon}-error")
+            self._icon_name = f"{self._item.cue.icon}-error"
         else:
-            self._icon = IconTheme.get(self._item.cue.icon)
+            self._icon_name = self._item.cue.icon
 
         self.update()
 
@@ -169,7 +193,7 @@ class CueStatusIcons(QWidget):
             qp.setPen(QPen(QBrush(QColor(0, 0, 0)), 2))
             qp.setBrush(QBrush(QColor(250, 220, 0)))
             qp.drawPath(path)
-        if self._icon is not None:
+        if self._icon_name is not None:
             qp.drawPixmap(
                 QRect(
                     indicator_width + CueStatusIcons.MARGIN,
@@ -177,7 +201,7 @@ class CueStatusIcons(QWidget):
                     status_size,
                     status_size,
                 ),
-                self._icon.pixmap(self._size()),
+                IconTheme.pixmap(self._icon_name, status_size),
             )
 
         qp.end()
@@ -186,6 +210,14 @@ class CueStatusIcons(QWidget):
 class NextActionIcon(QLabel):
     SIZE = 16
 
+    # {next-action value: icon-name}
+    _Icons = {
+        CueNextAction.TriggerAfterWait.value: "cue-trigger-next",
+        CueNextAction.TriggerAfterEnd.value: "cue-trigger-next",
+        CueNextAction.SelectAfterWait.value: "cue-select-next",
+        CueNextAction.SelectAfterEnd.value: "cue-select-next",
+    }
+
     def __init__(self, item, *args):
         super().__init__(*args)
         self.setAttribute(Qt.WA_TranslucentBackground)
@@ -198,21 +230,11 @@ class NextActionIcon(QLabel):
 
     def _updateIcon(self, nextAction):
         nextAction = CueNextAction(nextAction)
-        pixmap = IconTheme.get("").pixmap(self.SIZE)
-
-        if (
-            nextAction == CueNextAction.TriggerAfterWait
-            or nextAction == CueNextAction.TriggerAfterEnd
-        ):
-            pixmap = IconTheme.get("cue-trigger-next").pixmap(self.SIZE)
-        elif (
-            nextAction == CueNextAction.SelectAfterWait
-            or nextAction == CueNextAction.SelectAfterEnd
-        ):
-            pixmap = IconTheme.get("cue-select-next").pixmap(self.SIZE)
 
         self.setToolTip(tr_next_action(nextAction))
-        self.setPixmap(pixmap)
+        self.setPixmap(
+            IconTheme.pixmap(self._Icons.get(nextAction.value, ""), self.SIZE)
+        )
 
 
 class TimeWidget(QProgressBar):
@@ -229,7 +251,7 @@ class TimeWidget(QProgressBar):
 
     def _updateTime(self, time):
         self.setValue(time)
-        self.setFormat(strtime(time, accurate=1))
+        self.setFormat(_strtime_tenths(time))
 
     def _updateDuration(self, duration):
         self.duration = duration
@@ -280,8 +302,10 @@ class CueTimeWidget(TimeWidget):
             self._updateDuration, Connection.QtQueued
         )
 
+        # CueTime notifies from the (main thread) Clock timer, no need to
+        # queue the calls
         self.cueTime = CueTime(self.cue)
-        self.cueTime.notify.connect(self._updateTime, Connection.QtQueued)
+        self.cueTime.notify.connect(self._updateTime, Connection.Direct)
 
         if self.cue.state & CueState.Running:
             self._running()
@@ -311,12 +335,13 @@ class PreWaitWidget(TimeWidget):
             self._updateDuration, Connection.QtQueued
         )
 
+        # Notified from the (main thread) Clock timer, see CueTimeWidget
         self.waitTime = CueWaitTime(self.cue, mode=CueWaitTime.Mode.Pre)
-        self.waitTime.notify.connect(self._updateTime, Connection.QtQueued)
+        self.waitTime.notify.connect(self._updateTime, Connection.Direct)
 
     def _updateTime(self, time):
         self.setValue(time)
-        self.setFormat(strtime(self.duration - time, accurate=1))
+        self.setFormat(_strtime_tenths(self.duration - time))
 
     def _updateDuration(self, duration):
         # The wait time is in seconds, we need milliseconds
@@ -331,6 +356,8 @@ class PostWaitWidget(TimeWidget):
     def __init__(self, *args):
         super().__init__(*args)
         self.showZeroDuration = True
+        # (signal, slot) pairs connected for the current next-action
+        self._connections = []
 
         self.cue.changed("next_action").connect(
             self._nextActionChanged, Connection.QtQueued
@@ -343,72 +370,55 @@ class PostWaitWidget(TimeWidget):
 
     def _updateTime(self, time):
         self.setValue(time)
-        self.setFormat(strtime(self.duration - time, accurate=1))
+        self.setFormat(_strtime_tenths(self.duration - time))
 
     def _updateDuration(self, duration):
-        if (
-            self.cue.next_action == CueNextAction.TriggerAfterWait
-            or self.cue.next_action == CueNextAction.SelectAfterWait
-        ):
+        if self.cue.next_action in _AFTER_WAIT_ACTIONS:
             # The wait time is in seconds, we need milliseconds
             duration *= 1000
 
         super()._updateDuration(duration)
 
+    def _connect(self, signal, slot, mode=Connection.QtQueued):
+        signal.connect(slot, mode)
+        self._connections.append((signal, slot))
+
     def _nextActionChanged(self, nextAction):
-        self.cue.postwait_start.disconnect(self._running)
-        self.cue.postwait_stopped.disconnect(self._stop)
-        self.cue.postwait_paused.disconnect(self._pause)
-        self.cue.postwait_ended.disconnect(self._stop)
-
-        self.cue.interrupted.disconnect(self._stop)
-        self.cue.started.disconnect(self._running)
-        self.cue.stopped.disconnect(self._stop)
-        self.cue.paused.disconnect(self._pause)
-        self.cue.error.disconnect(self._stop)
-        self.cue.end.disconnect(self._stop)
-
-        self.cueTime.notify.disconnect(self._updateTime)
-        self.waitTime.notify.disconnect(self._updateTime)
-
-        self.cue.changed("post_wait").disconnect(self._updateDuration)
-        self.cue.changed("duration").disconnect(self._updateDuration)
-
-        if (
-            nextAction == CueNextAction.TriggerAfterEnd
-            or nextAction == CueNextAction.SelectAfterEnd
-        ):
-            self.cue.interrupted.connect(self._stop, Connection.QtQueued)
-            self.cue.started.connect(self._running, Connection.QtQueued)
-            self.cue.stopped.connect(self._stop, Connection.QtQueued)
-            self.cue.paused.connect(self._pause, Connection.QtQueued)
-            self.cue.error.connect(self._stop, Connection.QtQueued)
-            self.cue.end.connect(self._stop, Connection.QtQueued)
-            self.cue.changed("duration").connect(
-                self._updateDuration, Connection.QtQueued
+        # Disconnect only what was connected for the previous next-action
+        for signal, slot in self._connections:
+            signal.disconnect(slot)
+        self._connections.clear()
+
+        if nextAction in _AFTER_END_ACTIONS:
+            self._connect(self.cue.interrupted, self._stop)
+            self._connect(self.cue.started, self._running)
+            self._connect(self.cue.stopped, self._stop)
+            self._connect(self.cue.paused, self._pause)
+            self._connect(self.cue.error, self._stop)
+            self._connect(self.cue.end, self._stop)
+            self._connect(self.cue.changed("duration"), self._updateDuration)
+            # Notified from the (main thread) Clock timer, see CueTimeWidget
+            self._connect(
+                self.cueTime.notify, self._updateTime, Connection.Direct
             )
 
-            self.cueTime.notify.connect(self._updateTime, Connection.QtQueued)
             self._updateDuration(self.cue.duration)
         else:
-            self.cue.postwait_start.connect(self._running, Connection.QtQueued)
-            self.cue.postwait_stopped.connect(self._stop, Connection.QtQueued)
-            self.cue.postwait_paused.connect(self._pause, Connection.QtQueued)
-            self.cue.postwait_ended.connect(self._stop, Connection.QtQueued)
-            self.cue.changed("post_wait").connect(
-                self._updateDuration, Connection.QtQueued
+            self._connect(self.cue.postwait_start, self._running)
+            self._connect(self.cue.postwait_stopped, self._stop)
+            self._connect(self.cue.postwait_paused, self._pause)
+            self._connect(self.cue.postwait_ended, self._stop)
+            self._connect(self.cue.changed("post_wait"), self._updateDuration)
+            self._connect(
+                self.waitTime.notify, self._updateTime, Connection.Direct
             )
 
-            self.waitTime.notify.connect(self._updateTime, Connection.QtQueued)
             self._updateDuration(self.cue.post_wait)
 
     def _stop(self):
         super()._stop()
 
-        if (
-            self.cue.next_action == CueNextAction.TriggerAfterEnd
-            or self.cue.next_action == CueNextAction.SelectAfterEnd
-        ):
+        if self.cue.next_action in _AFTER_END_ACTIONS:
             self._updateDuration(self.cue.duration)
         else:
             self._updateDuration(self.cue.post_wait)
@@ -19,7 +19,7 @@ import glob
 import os
 from typing import Union
 
-from PyQt5.QtGui import QIcon
+from PyQt5.QtGui import QIcon, QPixmap, QPixmapCache
 
 from lisp import ICON_THEMES_DIR, ICON_THEME_COMMON
 
@@ -62,9 +62,26 @@ class IconTheme:
 
         return icon
 
+    @staticmethod
+    def pixmap(icon_name, size) -> QPixmap:
+        """Return the icon rasterized at the given size.
+
+        Pixmaps are stored in the global QPixmapCache, so widgets showing the
+        same icon share a single rasterization.
+        """
+        key = f"lisp-icon:{icon_name}:{size}"
+        pixmap = QPixmapCache.find(key)
+
+        if pixmap is None:
+            pixmap = IconTheme.get(icon_name).pixmap(size)
+            QPixmapCache.insert(key, pixmap)
+
+        return pixmap
+
     @staticmethod
     def set_theme_name(theme_name):
         IconTheme._GlobalCache.clear()
+        QPixmapCache.clear()
         IconTheme._GlobalTheme = IconTheme(theme_name, ICON_THEME_COMMON)
 
         QIcon.setThemeSearchPaths([ICON_THEMES_DIR])